@@ -0,0 +1,223 @@
+"""
+Catalog Import / Export
+
+Streaming NDJSON import and export for the "product" collection.
+
+Import reads NDJSON lines in chunks, validates each chunk against
+schemas.Product in a worker pool and upserts by slug with batched
+bulk_write, so re-running an import is idempotent and concurrent imports
+cannot create duplicate products.
+
+Usage from the command line:
+    python catalog_io.py import catalog.ndjson
+    python catalog_io.py export > catalog.ndjson
+    python catalog_io.py dedupe    # once, before the unique slug index exists
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from pydantic import ValidationError
+from pymongo import ASCENDING, DeleteMany, UpdateOne
+from pymongo.errors import OperationFailure
+
+from database import _require_db, primary_collection, stream_documents
+from schemas import Product
+
+PRODUCT_COLLECTION = "product"
+CHUNK_SIZE = int(os.getenv("CATALOG_CHUNK_SIZE", 1000))
+IMPORT_WORKERS = int(os.getenv("CATALOG_IMPORT_WORKERS", os.cpu_count() or 1))
+# Maximum number of chunks validated ahead of the writer
+MAX_PENDING_CHUNKS = 4
+# Number of rejected lines reported back to the caller
+MAX_REPORTED_ERRORS = 50
+
+_indexes_ready = False
+
+
+class CatalogIndexError(Exception):
+    """The unique slug index can't be built because duplicate slugs exist"""
+
+
+def ensure_catalog_indexes():
+    """Create the unique slug index that makes upserts race-free"""
+    global _indexes_ready
+    _require_db()
+    if not _indexes_ready:
+        try:
+            primary_collection(PRODUCT_COLLECTION).create_index([("slug", ASCENDING)], unique=True, name="slug_unique")
+        except OperationFailure as e:
+            if e.code != 11000:
+                raise
+            raise CatalogIndexError(
+                "Duplicate product slugs prevent creating the unique slug index. "
+                "Run `python catalog_io.py dedupe` to remove the extra copies."
+            ) from e
+        _indexes_ready = True
+
+
+def dedupe_products() -> int:
+    """Delete duplicate products, keeping the oldest document per slug; returns how many were removed"""
+    _require_db()
+    collection = primary_collection(PRODUCT_COLLECTION)
+    duplicates = collection.aggregate([
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": "$slug", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    ops = [DeleteMany({"_id": {"$in": group["ids"][1:]}}) for group in duplicates]
+    if not ops:
+        return 0
+    return collection.bulk_write(ops, ordered=False).deleted_count
+
+
+def iter_chunks(lines: Iterable[Any], chunk_size: int = CHUNK_SIZE) -> Iterator[List[Tuple[int, str]]]:
+    """Group non-blank lines into chunks of (line_number, text) pairs"""
+    chunk = []
+    for line_no, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append((line_no, line))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _describe(err: Dict[str, Any]) -> str:
+    """Format one pydantic error as 'field.path: message'"""
+    loc = ".".join(map(str, err["loc"]))
+    return f"{loc}: {err['msg']}" if loc else err["msg"]
+
+
+def validate_chunk(chunk: List[Tuple[int, str]]) -> Tuple[List[dict], List[Dict[str, Any]]]:
+    """Parse and validate one chunk; returns (valid products, errors)"""
+    products, errors = [], []
+    for line_no, line in chunk:
+        try:
+            # Only fields present in the line are written to existing products
+            products.append(Product.model_validate_json(line).model_dump(exclude_unset=True))
+        except ValidationError as e:
+            errors.append({"line": line_no, "error": "; ".join(_describe(err) for err in e.errors(include_url=False))})
+    return products, errors
+
+
+def _insert_defaults(product: dict) -> dict:
+    """schemas.Product defaults for the fields the product doesn't set"""
+    return {
+        name: field.get_default(call_default_factory=True)
+        for name, field in Product.model_fields.items()
+        if name not in product and not field.is_required()
+    }
+
+
+def upsert_products(products: List[dict], overwrite: bool = True):
+    """Upsert products by slug in a single bulk_write; returns the BulkWriteResult
+
+    Existing products only have the given fields updated; schema defaults are
+    applied on insert. With overwrite=False existing products are left
+    untouched, which is what seeding wants.
+    """
+    ensure_catalog_indexes()
+    now = datetime.now(timezone.utc)
+    ops = []
+    for p in products:
+        defaults = _insert_defaults(p)
+        if overwrite:
+            update = {
+                "$set": {**p, "updated_at": now},
+                "$setOnInsert": {**defaults, "created_at": now},
+            }
+        else:
+            update = {"$setOnInsert": {**defaults, **p, "created_at": now, "updated_at": now}}
+        ops.append(UpdateOne({"slug": p["slug"]}, update, upsert=True))
+    return primary_collection(PRODUCT_COLLECTION).bulk_write(ops, ordered=False)
+
+
+def import_catalog(lines: Iterable[Any], chunk_size: int = CHUNK_SIZE, workers: int = IMPORT_WORKERS) -> Dict[str, Any]:
+    """Stream NDJSON product lines into the catalog
+
+    Chunks are validated in a process pool while earlier chunks are being
+    written, with at most MAX_PENDING_CHUNKS in flight so memory stays
+    bounded regardless of the input size.
+    """
+    ensure_catalog_indexes()
+    summary = {"processed": 0, "inserted": 0, "updated": 0, "rejected": 0, "errors": []}
+
+    def record(result):
+        products, errors = result
+        summary["processed"] += len(products) + len(errors)
+        summary["rejected"] += len(errors)
+        room = MAX_REPORTED_ERRORS - len(summary["errors"])
+        if room > 0:
+            summary["errors"].extend(errors[:room])
+        if products:
+            written = upsert_products(products)
+            summary["inserted"] += written.upserted_count
+            summary["updated"] += written.modified_count
+
+    chunks = iter_chunks(lines, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            record(validate_chunk(chunk))
+        return summary
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(validate_chunk, chunk))
+            if len(pending) >= MAX_PENDING_CHUNKS:
+                record(pending.pop(0).result())
+        for future in pending:
+            record(future.result())
+    return summary
+
+
+def export_catalog(batch_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Yield the catalog as NDJSON lines without loading the whole collection
+
+    Only schemas.Product fields are exported so the output can be fed straight
+    back into import_catalog.
+    """
+    projection = {field: 1 for field in Product.model_fields}
+    projection["_id"] = 0
+    docs = stream_documents(PRODUCT_COLLECTION, projection=projection,
+                            sort=[("slug", ASCENDING)], batch_size=batch_size, catalog=True)
+    for doc in docs:
+        yield json.dumps(doc, ensure_ascii=False) + "\n"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import or export the product catalog as NDJSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Upsert products from an NDJSON file ('-' for stdin)")
+    imp.add_argument("path")
+    imp.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    imp.add_argument("--workers", type=int, default=IMPORT_WORKERS)
+    exp = sub.add_parser("export", help="Write the catalog as NDJSON to stdout")
+    exp.add_argument("--batch-size", type=int, default=CHUNK_SIZE)
+    sub.add_parser("dedupe", help="Remove duplicate slugs so the unique slug index can be built")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        if args.path == "-":
+            result = import_catalog(sys.stdin, args.chunk_size, args.workers)
+        else:
+            with open(args.path, "r", encoding="utf-8") as f:
+                result = import_catalog(f, args.chunk_size, args.workers)
+        print(json.dumps(result, indent=2))
+    elif args.command == "dedupe":
+        print(json.dumps({"removed": dedupe_products()}))
+    else:
+        for line in export_catalog(args.batch_size):
+            sys.stdout.write(line)
@@ -0,0 +1,116 @@
+"""
+Response Compression
+
+Content-negotiated gzip/brotli bodies for cacheable JSON payloads.
+
+Each payload is serialized once and identified by an ETag derived from its
+bytes. The compressed variants are cached alongside that ETag, so a catalog
+response is compressed once per encoding rather than once per request.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+import brotli
+
+# Bodies smaller than this are sent uncompressed
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+# Number of distinct ETags kept pre-compressed
+CACHE_ENTRIES = int(os.getenv("COMPRESSION_CACHE_ENTRIES", 256))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+SUPPORTED_ENCODINGS = ("br", "gzip")
+
+_cache: "OrderedDict[str, Dict[str, bytes]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return "identity"
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = "identity", 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header (RFC 9110 13.1.2)"""
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _variant(etag: str, body: bytes, encoding: str) -> bytes:
+    """Return the cached body for (etag, encoding), compressing on first use"""
+    with _lock:
+        variants = _cache.get(etag)
+        if variants is not None:
+            _cache.move_to_end(etag)
+            if encoding in variants:
+                return variants[encoding]
+    compressed = _compress(body, encoding)
+    with _lock:
+        variants = _cache.setdefault(etag, {})
+        variants[encoding] = compressed
+        _cache.move_to_end(etag)
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return compressed
+
+
+def cached_json_response(request: Request, payload: Any, max_age: int = 60) -> Response:
+    """Build a JSON response with an ETag and a pre-compressed body if accepted"""
+    # jsonable_encoder keeps datetimes etc. in the same ISO-8601 form as other endpoints
+    body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = 'W/"%s"' % hashlib.sha1(body).hexdigest()
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "Accept-Encoding",
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding != "identity" and len(body) >= MIN_SIZE:
+        body = _variant(etag, body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -6,10 +6,13 @@ Import and use these functions in your API endpoints for database operations.
 """
 
 from pymongo import MongoClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+from pymongo.write_concern import WriteConcern
 from datetime import datetime, timezone
+import asyncio
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import Any, AsyncIterator, Iterator, List, Tuple, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -17,20 +20,52 @@ load_dotenv()
 
 _client = None
 db = None
+# Catalog reads: secondaries preferred, bounded staleness
+catalog_db = None
+# Orders / inventory: primary reads, majority-acknowledged writes
+primary_db = None
 
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
+# Hard cap on documents materialized by get_documents when no limit is given
+MAX_DOCUMENTS = int(os.getenv("MAX_DOCUMENTS", 1000))
+# Documents fetched per round trip when streaming cursors
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 500))
+# MongoDB rejects maxStalenessSeconds below 90
+CATALOG_MAX_STALENESS = max(90, int(os.getenv("CATALOG_MAX_STALENESS_SECONDS", 90)))
+
+def routed_handles(database):
+    """Return (catalog_db, primary_db) views of a database with their read/write routing"""
+    catalog = database.with_options(read_preference=SecondaryPreferred(max_staleness=CATALOG_MAX_STALENESS))
+    primary = database.with_options(read_preference=Primary(), write_concern=WriteConcern("majority"))
+    return catalog, primary
+
 if database_url and database_name:
     _client = MongoClient(database_url)
     db = _client[database_name]
+    catalog_db, primary_db = routed_handles(db)
 
-# Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
-    """Insert a single document with timestamp"""
+def _require_db():
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
 
+# Read routing
+def catalog_collection(collection_name: str, fresh: bool = False):
+    """Collection handle for catalog reads; fresh=True reads from the primary (read-your-writes, internal use)"""
+    _require_db()
+    return primary_db[collection_name] if fresh else catalog_db[collection_name]
+
+def primary_collection(collection_name: str):
+    """Collection handle for order/inventory paths: primary reads, majority writes"""
+    _require_db()
+    return primary_db[collection_name]
+
+# Helper functions for common database operations
+def create_document(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp (primary, majority write concern)"""
+    _require_db()
+
     # Convert Pydantic model to dict if needed
     if isinstance(data, BaseModel):
         data_dict = data.model_dump()
@@ -40,16 +75,71 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = primary_db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
-    if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-    
-    cursor = db[collection_name].find(filter_dict or {})
+def _find(collection_name: str, filter_dict: dict = None, projection: dict = None,
+          sort: List[Tuple[str, int]] = None, limit: int = None, batch_size: int = None,
+          catalog: bool = False):
+    collection = catalog_collection(collection_name) if catalog else primary_collection(collection_name)
+    cursor = collection.find(filter_dict or {}, projection)
+    if sort:
+        cursor = cursor.sort(sort)
     if limit:
         cursor = cursor.limit(limit)
-    
-    return list(cursor)
+    if batch_size:
+        cursor = cursor.batch_size(batch_size)
+    return cursor
+
+def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None,
+                  projection: dict = None, sort: List[Tuple[str, int]] = None, catalog: bool = False):
+    """Get documents from collection (capped at MAX_DOCUMENTS; use stream_documents for more)
+
+    Reads go to the primary unless catalog=True routes them to secondaries.
+    """
+    limit = min(limit, MAX_DOCUMENTS) if limit else MAX_DOCUMENTS
+    return list(_find(collection_name, filter_dict, projection, sort, limit, catalog=catalog))
+
+def _check_batch_size(batch_size: int) -> int:
+    if batch_size is None:
+        return STREAM_BATCH_SIZE
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+    return batch_size
+
+def stream_documents(collection_name: str, filter_dict: dict = None, projection: dict = None,
+                     sort: List[Tuple[str, int]] = None, limit: int = None,
+                     batch_size: int = STREAM_BATCH_SIZE, catalog: bool = False) -> Iterator[dict]:
+    """Yield documents one at a time, fetching batch_size per round trip"""
+    batch_size = _check_batch_size(batch_size)
+    cursor = _find(collection_name, filter_dict, projection, sort, limit, batch_size, catalog)
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+async def astream_documents(collection_name: str, filter_dict: dict = None, projection: dict = None,
+                            sort: List[Tuple[str, int]] = None, limit: int = None,
+                            batch_size: int = STREAM_BATCH_SIZE, catalog: bool = False) -> AsyncIterator[dict]:
+    """Async variant of stream_documents; cursor round trips run in a worker thread"""
+    batch_size = _check_batch_size(batch_size)
+    cursor = _find(collection_name, filter_dict, projection, sort, limit, batch_size, catalog)
+    loop = asyncio.get_running_loop()
+
+    def next_batch() -> List[Any]:
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                break
+        return batch
+
+    try:
+        while True:
+            batch = await loop.run_in_executor(None, next_batch)
+            if not batch:
+                break
+            for doc in batch:
+                yield doc
+    finally:
+        cursor.close()
@@ -1,10 +1,20 @@
 import os
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Header, Depends, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from fastapi.encoders import jsonable_encoder
+from typing import List, Dict, Any, Optional
+import hmac
+import json
 
-from database import db, create_document
+from database import db, create_document, astream_documents, catalog_collection
 from schemas import Order
+from catalog_io import import_catalog, export_catalog, upsert_products, CatalogIndexError
+from compression import cached_json_response, MIN_SIZE as COMPRESSION_MIN_SIZE
+import profiling
+from serviceability import check_pincode, normalize_pincode
+import notifications
 
 app = FastAPI(title="SurpriseSoul API")
 
@@ -16,12 +26,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Catch-all gzip for everything else; responses that already carry a
+# Content-Encoding (the pre-compressed catalog bodies) are passed through.
+app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+app.add_middleware(profiling.ProfilingMiddleware)
+
 @app.get("/")
 def root():
     return {"message": "SurpriseSoul API running"}
 
 # Utilities
 
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guard admin endpoints with the ADMIN_TOKEN environment variable"""
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints disabled (ADMIN_TOKEN not set)")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
 def to_serializable(doc):
     if isinstance(doc, dict):
         out = {}
@@ -37,6 +60,25 @@ def to_serializable(doc):
         return out
     return doc
 
+
+def ndjson_line(doc) -> str:
+    # jsonable_encoder keeps datetimes in the same ISO-8601 form as the JSON endpoints
+    return json.dumps(jsonable_encoder(to_serializable(doc))) + "\n"
+
+
+def ndjson_response(docs, filename: Optional[str] = None) -> StreamingResponse:
+    """Stream a (sync or async) iterable of documents as NDJSON"""
+    if hasattr(docs, "__aiter__"):
+        async def body():
+            async for doc in docs:
+                yield ndjson_line(doc)
+    else:
+        def body():
+            for doc in docs:
+                yield ndjson_line(doc)
+    headers = {"Content-Disposition": f"attachment; filename={filename}"} if filename else None
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers=headers)
+
 # -----------------------------
 # Demo catalog (fallback when DB missing)
 # -----------------------------
@@ -248,8 +290,8 @@ def seed_products():
         # If database isn't configured, just no-op so frontend still works
         return {"seeded": False, "message": "Database not configured"}
 
-    existing = db["product"].count_documents({})
-    if existing > 0:
+    # Only seed an empty catalog; the slug upsert below keeps concurrent seeds race-free
+    if catalog_collection("product", fresh=True).find_one({}, {"_id": 1}) is not None:
         return {"seeded": False, "message": "Products already exist"}
 
     sample_products: List[dict] = [
@@ -309,36 +351,113 @@ def seed_products():
         }
     ]
 
-    for p in sample_products:
-        db["product"].insert_one(p)
+    # Upsert by slug without overwriting, so concurrent or repeated seeds are no-ops
+    try:
+        result = upsert_products(sample_products, overwrite=False)
+    except CatalogIndexError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if result.upserted_count == 0:
+        return {"seeded": False, "message": "Products already exist"}
+    return {"seeded": True, "count": result.upserted_count}
+
+
+# -----------------------------
+# Catalog import / export (NDJSON)
+# -----------------------------
+@app.post("/catalog/import", dependencies=[Depends(require_admin)])
+def import_products(file: UploadFile = File(...)):
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    try:
+        # Validate in-process: forking a pool from the threaded server (with an
+        # open MongoClient) per request isn't safe. The CLI uses the pool.
+        return import_catalog(file.file, workers=1)
+    except CatalogIndexError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.get("/catalog/export", dependencies=[Depends(require_admin)])
+def export_products():
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    return StreamingResponse(
+        export_catalog(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=catalog.ndjson"},
+    )
+
+
+@app.get("/orders/export", dependencies=[Depends(require_admin)])
+def export_orders(status: Optional[str] = None):
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    docs = astream_documents("order", {"status": status} if status else None, sort=[("_id", 1)])
+    return ndjson_response(docs, filename="orders.ndjson")
+
 
-    return {"seeded": True, "count": len(sample_products)}
+# Catalog reads go to secondaries (bounded staleness). Admins can pass
+# fresh=true to read from the primary right after a write (read-your-writes);
+# public clients can't, so they can't bypass the routing.
+def require_admin_if_fresh(fresh: bool = False, x_admin_token: Optional[str] = Header(None)) -> bool:
+    if fresh:
+        require_admin(x_admin_token)
+    return fresh
 
 
 @app.get("/products")
-def list_products():
+def list_products(request: Request, fresh: bool = Depends(require_admin_if_fresh)):
     if db is None:
         # fallback demo products when DB is not available
-        return demo_catalog()
-    products = list(db["product"].find({}).limit(48))
-    return [to_serializable(p) for p in products]
+        return cached_json_response(request, demo_catalog())
+    products = list(catalog_collection("product", fresh=fresh).find({}).limit(48))
+    return cached_json_response(request, [to_serializable(p) for p in products])
 
 
 @app.get("/products/{slug}")
-def get_product(slug: str):
+def get_product(slug: str, request: Request, fresh: bool = Depends(require_admin_if_fresh)):
     if db is None:
         demo = demo_product_detail(slug)
         if not demo:
             raise HTTPException(status_code=404, detail="Product not found")
-        return demo
-    p = db["product"].find_one({"slug": slug})
+        return cached_json_response(request, demo)
+    p = catalog_collection("product", fresh=fresh).find_one({"slug": slug})
     if not p:
         raise HTTPException(status_code=404, detail="Product not found")
-    return to_serializable(p)
+    return cached_json_response(request, to_serializable(p))
+
+
+@app.get("/serviceability/{pincode}")
+def get_serviceability(pincode: str):
+    if normalize_pincode(pincode) is None:
+        raise HTTPException(status_code=400, detail="Invalid pincode")
+    info = check_pincode(pincode)
+    if info is None:
+        raise HTTPException(status_code=503, detail="Serviceability data not loaded")
+    return info
+
+
+def validate_serviceability(order: Order):
+    """Reject orders to unserviceable pincodes, COD where it isn't offered, or a wrong shipping charge"""
+    if not order.customer or not order.customer.pincode:
+        return
+    info = check_pincode(order.customer.pincode)
+    if info is None:
+        # No serviceability data loaded; don't block checkout
+        return
+    if not info["serviceable"]:
+        raise HTTPException(status_code=422, detail="Delivery not available for this pincode")
+    if order.payment_method == "COD" and not info["cod_available"]:
+        raise HTTPException(status_code=422, detail="Cash on Delivery not available for this pincode")
+    if abs(order.shipping - info["shipping_charge"]) > 0.005:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Shipping charge for this pincode is {info['shipping_charge']}",
+        )
 
 
 @app.post("/orders")
 def create_order(order: Order):
+    validate_serviceability(order)
     if db is None:
         # accept orders even without DB for demo
         return {"order_id": "demo-order"}
@@ -346,6 +465,75 @@ def create_order(order: Order):
     return {"order_id": order_id}
 
 
+# -----------------------------
+# Notifications
+# -----------------------------
+# The app has no end-user identity yet, so these are back-office endpoints
+# behind the admin token rather than something the storefront calls directly.
+
+@app.get("/users/{user_id}/notifications/unread-count", dependencies=[Depends(require_admin)])
+def get_unread_notification_count(user_id: str):
+    if db is None:
+        return {"unread": 0}
+    return {"unread": notifications.get_unread_count(user_id)}
+
+
+@app.get("/users/{user_id}/notifications", dependencies=[Depends(require_admin)])
+def get_notifications(user_id: str, unread: bool = False, cursor: Optional[str] = None,
+                      limit: int = Query(20, ge=1, le=notifications.MAX_PAGE_SIZE)):
+    if db is None:
+        return {"items": [], "next_cursor": None}
+    try:
+        page = notifications.get_inbox(user_id, unread_only=unread, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": [to_serializable(n) for n in page["items"]], "next_cursor": page["next_cursor"]}
+
+
+@app.post("/users/{user_id}/notifications/read-all", dependencies=[Depends(require_admin)])
+def mark_all_notifications_read(user_id: str):
+    if db is None:
+        return {"marked": 0}
+    return {"marked": notifications.mark_all_read(user_id)}
+
+
+@app.post("/users/{user_id}/notifications/{notification_id}/read", dependencies=[Depends(require_admin)])
+def mark_notification_read(user_id: str, notification_id: str):
+    if db is None:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    if not notifications.mark_read(user_id, notification_id):
+        raise HTTPException(status_code=404, detail="Notification not found or already read")
+    return {"marked": 1}
+
+
+# -----------------------------
+# Profiling (admin)
+# -----------------------------
+
+def render_profile(capture, format: str, name: str):
+    if format == "speedscope":
+        return profiling.to_speedscope(capture, name=name)
+    return PlainTextResponse(profiling.to_collapsed(capture))
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+def capture_profile(seconds: float = Query(5, gt=0, le=profiling.MAX_CAPTURE_SECONDS), format: str = "collapsed"):
+    if format not in ("collapsed", "speedscope"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'speedscope'")
+    capture = profiling.capture_for(seconds)
+    return render_profile(capture, format, f"capture-{seconds:g}s")
+
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def get_request_profile(profile_id: str, format: str = "collapsed"):
+    if format not in ("collapsed", "speedscope"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'speedscope'")
+    capture = profiling.get_profile(profile_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return render_profile(capture, format, profile_id)
+
+
 @app.post("/upload")
 def upload_image(file: UploadFile = File(...)):
     # In demo, we don't persist the file; return a pretend URL so the UI can proceed
@@ -0,0 +1,228 @@
+"""
+Notifications
+
+Per-user inbox with an atomically maintained unread counter.
+
+Unread counts live in the "notification_counters" collection (one document
+per user, {_id: user_id, unread: n}) and are adjusted with $inc whenever a
+notification is created or marked read, so the badge count is a single
+primary-key read instead of a count over the user's whole history. Counts
+are additionally cached in-process for UNREAD_COUNT_TTL seconds.
+
+Notifications that predate the counters are counted once by
+backfill_unread_counters() (`python notifications.py backfill`), run
+before this code starts serving traffic. After that every change is a
+single $inc: the counter is incremented before a notification is inserted
+and only decremented after a notification is flipped to read, so it can't
+go negative; a negative value is logged as corruption and repaired with
+recount_unread().
+
+Usage from the command line:
+    python notifications.py backfill
+    python notifications.py recount <user_id>
+
+The inbox is served from the (user_id, is_read, created_at, _id) index and
+paged with a (created_at, _id) cursor.
+"""
+
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING, UpdateOne
+
+from database import create_document, primary_collection
+
+NOTIFICATION_COLLECTION = "notifications"
+COUNTER_COLLECTION = "notification_counters"
+UNREAD_COUNT_TTL = float(os.getenv("UNREAD_COUNT_TTL", 5))
+MAX_CACHED_COUNTS = 10000
+MAX_PAGE_SIZE = 100
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+logger = logging.getLogger(__name__)
+
+_indexes_ready = False
+# user_id -> (expires_at, unread)
+_count_cache: Dict[str, tuple] = {}
+
+
+def ensure_notification_indexes():
+    """Create the inbox index"""
+    global _indexes_ready
+    if not _indexes_ready:
+        primary_collection(NOTIFICATION_COLLECTION).create_index(
+            [("user_id", 1), ("is_read", 1), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_inbox",
+        )
+        _indexes_ready = True
+
+
+def _adjust_unread(user_id: str, delta: int):
+    _count_cache.pop(user_id, None)
+    if delta:
+        primary_collection(COUNTER_COLLECTION).update_one(
+            {"_id": user_id}, {"$inc": {"unread": delta}}, upsert=True
+        )
+
+
+def create_notification(user_id: str, title: str, message: str, type: str = "info",
+                        action_url: Optional[str] = None, metadata: dict = None):
+    """Create a notification and bump the user's unread counter"""
+    ensure_notification_indexes()
+    notification_data = {
+        "user_id": user_id,
+        "title": title,
+        "message": message,
+        "type": type,  # info, success, warning, error
+        "is_read": False,
+        "action_url": action_url,
+        "metadata": metadata or {}
+    }
+    _adjust_unread(user_id, 1)
+    try:
+        return create_document(NOTIFICATION_COLLECTION, notification_data)
+    except Exception:
+        _adjust_unread(user_id, -1)
+        raise
+
+
+def mark_read(user_id: str, notification_id: str) -> bool:
+    """Mark one notification read; returns False if it was missing or already read"""
+    try:
+        oid = ObjectId(notification_id)
+    except InvalidId:
+        return False
+    result = primary_collection(NOTIFICATION_COLLECTION).update_one(
+        {"_id": oid, "user_id": user_id, "is_read": False},
+        {"$set": {"is_read": True, "read_at": datetime.now(timezone.utc)}},
+    )
+    # Only the request that actually flipped the flag decrements the counter
+    _adjust_unread(user_id, -result.modified_count)
+    return result.modified_count > 0
+
+
+def mark_all_read(user_id: str) -> int:
+    """Mark every unread notification read; returns how many were flipped"""
+    result = primary_collection(NOTIFICATION_COLLECTION).update_many(
+        {"user_id": user_id, "is_read": False},
+        {"$set": {"is_read": True, "read_at": datetime.now(timezone.utc)}},
+    )
+    _adjust_unread(user_id, -result.modified_count)
+    return result.modified_count
+
+
+def get_unread_count(user_id: str) -> int:
+    """Unread badge count, served from the in-process cache when fresh"""
+    now = time.monotonic()
+    cached = _count_cache.get(user_id)
+    if cached and cached[0] > now:
+        return cached[1]
+    doc = primary_collection(COUNTER_COLLECTION).find_one({"_id": user_id})
+    unread = doc["unread"] if doc else 0
+    if unread < 0:
+        logger.error("Unread counter for %s is %d; rebuilding", user_id, unread)
+        unread = recount_unread(user_id)
+    if len(_count_cache) >= MAX_CACHED_COUNTS:
+        _count_cache.clear()
+    _count_cache[user_id] = (now + UNREAD_COUNT_TTL, unread)
+    return unread
+
+
+def recount_unread(user_id: str) -> int:
+    """Rebuild a user's counter from the notifications themselves (repair tool)
+
+    Count-then-set isn't atomic with concurrent creates, so this is for
+    repairing a corrupt counter, not for routine maintenance.
+    """
+    unread = primary_collection(NOTIFICATION_COLLECTION).count_documents(
+        {"user_id": user_id, "is_read": False}
+    )
+    primary_collection(COUNTER_COLLECTION).update_one(
+        {"_id": user_id}, {"$set": {"unread": unread}}, upsert=True
+    )
+    _count_cache.pop(user_id, None)
+    return unread
+
+
+def backfill_unread_counters() -> int:
+    """Set every user's counter from their existing notifications; returns users updated
+
+    One-off migration for notifications written before counters existed.
+    Run it before the counter-maintaining code serves traffic: like
+    recount_unread() it isn't atomic with concurrent writes.
+    """
+    totals = primary_collection(NOTIFICATION_COLLECTION).aggregate([
+        {"$group": {"_id": "$user_id", "unread": {"$sum": {"$cond": [{"$eq": ["$is_read", False]}, 1, 0]}}}},
+    ], allowDiskUse=True)
+    ops = [UpdateOne({"_id": t["_id"]}, {"$set": {"unread": t["unread"]}}, upsert=True) for t in totals]
+    _count_cache.clear()
+    if not ops:
+        return 0
+    primary_collection(COUNTER_COLLECTION).bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def encode_cursor(created_at: datetime, notification_id: ObjectId) -> str:
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return f"{(created_at - _EPOCH) // timedelta(milliseconds=1)}-{notification_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Parse a page cursor; raises ValueError if it is malformed"""
+    millis, _, notification_id = cursor.partition("-")
+    try:
+        return _EPOCH + timedelta(milliseconds=int(millis)), ObjectId(notification_id)
+    except (InvalidId, TypeError, OverflowError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def get_inbox(user_id: str, unread_only: bool = False, cursor: Optional[str] = None,
+              limit: int = 20) -> Dict[str, Any]:
+    """Newest-first page of notifications; pass next_cursor to fetch the next page
+
+    Pages are ordered by (created_at, _id) so notifications sharing a
+    millisecond are neither skipped nor repeated across pages. Both variants
+    use the user_inbox index: listing everything matches is_read in
+    [False, True], which MongoDB answers with a merge of the two index ranges
+    instead of an in-memory sort.
+    """
+    ensure_notification_indexes()
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    filter_dict = {"user_id": user_id, "is_read": False if unread_only else {"$in": [False, True]}}
+    if cursor is not None:
+        created_at, last_id = decode_cursor(cursor)
+        filter_dict["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]
+    items = list(
+        primary_collection(NOTIFICATION_COLLECTION)
+        .find(filter_dict)
+        .sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+        .limit(limit)
+    )
+    next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["_id"]) if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Maintain notification unread counters")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("backfill", help="Count unread notifications for every user (one-off migration)")
+    recount = sub.add_parser("recount", help="Repair one user's counter")
+    recount.add_argument("user_id")
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        print(json.dumps({"users": backfill_unread_counters()}))
+    else:
+        print(json.dumps({"user_id": args.user_id, "unread": recount_unread(args.user_id)}))
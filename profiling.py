@@ -0,0 +1,210 @@
+"""
+Sampling Profiler
+
+Low-overhead stack sampling for request profiling.
+
+A background thread wakes every SAMPLE_INTERVAL seconds while at least one
+capture is active and records the stack of every other thread via
+sys._current_frames(). Stacks are aggregated in collapsed form
+("module:func;module:func" -> count), which flamegraph.pl consumes directly
+and which can be converted to speedscope's JSON format.
+
+Because samples are taken from all threads, a per-request profile also
+includes whatever concurrent requests were doing at the time. Idle worker
+threads (blocked in a wait or select) are skipped.
+
+When profiling is disabled, the middleware costs a rate check per request
+plus, when a trigger token is configured, a scan of the request headers.
+"""
+
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional
+
+# Fraction of requests profiled automatically (0 disables sampling)
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+# Seconds between stack samples
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
+# Request header that forces profiling of a single request; its value must
+# match PROFILE_TRIGGER_TOKEN (defaults to ADMIN_TOKEN, unset disables it)
+TRIGGER_HEADER = b"x-profile"
+TRIGGER_TOKEN = os.getenv("PROFILE_TRIGGER_TOKEN") or os.getenv("ADMIN_TOKEN")
+# Number of per-request profiles kept for retrieval
+MAX_STORED_PROFILES = 50
+MAX_CAPTURE_SECONDS = 60
+MAX_STACK_DEPTH = 128
+
+# Functions at the top of a stack that mean the thread is idle
+_IDLE_FUNCTIONS = {"wait", "select", "poll", "epoll", "_worker", "accept", "run_forever"}
+
+
+def _collapse(frame) -> Optional[str]:
+    if frame.f_code.co_name in _IDLE_FUNCTIONS:
+        return None
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "?")
+        parts.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    parts.reverse()
+    return ";".join(parts)
+
+
+class _Sampler:
+    """Shared sampling thread; runs only while at least one capture is active"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._captures: Dict[int, Counter] = {}
+        self._thread = None
+
+    def start(self, capture: "Counter[str]"):
+        with self._lock:
+            self._captures[id(capture)] = capture
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, capture: "Counter[str]"):
+        with self._lock:
+            self._captures.pop(id(capture), None)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    stack = _collapse(frame)
+                    if stack:
+                        stacks.append(stack)
+            frame = None
+            with self._lock:
+                if not self._captures:
+                    self._thread = None
+                    return
+                for capture in self._captures.values():
+                    capture.update(stacks)
+            time.sleep(SAMPLE_INTERVAL)
+
+
+_sampler = _Sampler()
+_profiles: "OrderedDict[str, Counter]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def should_profile(headers) -> bool:
+    """Decide whether a request is profiled (random sample or header trigger)"""
+    if SAMPLE_RATE and random.random() < SAMPLE_RATE:
+        return True
+    if TRIGGER_TOKEN:
+        for name, value in headers:
+            if name == TRIGGER_HEADER:
+                return hmac.compare_digest(value, TRIGGER_TOKEN.encode("latin-1"))
+    return False
+
+
+def start_capture() -> "Counter[str]":
+    capture = Counter()
+    _sampler.start(capture)
+    return capture
+
+
+def stop_capture(capture: "Counter[str]", profile_id: str):
+    """Stop a capture and keep it for retrieval under profile_id"""
+    _sampler.stop(capture)
+    with _profiles_lock:
+        _profiles[profile_id] = capture
+        while len(_profiles) > MAX_STORED_PROFILES:
+            _profiles.popitem(last=False)
+
+
+def get_profile(profile_id: str) -> Optional["Counter[str]"]:
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+def capture_for(seconds: float) -> "Counter[str]":
+    """Sample all threads for the given number of seconds (0 < seconds <= MAX_CAPTURE_SECONDS)"""
+    if not 0 < seconds <= MAX_CAPTURE_SECONDS:
+        raise ValueError(f"seconds must be in (0, {MAX_CAPTURE_SECONDS}]")
+    capture = Counter()
+    _sampler.start(capture)
+    try:
+        time.sleep(seconds)
+    finally:
+        _sampler.stop(capture)
+    return capture
+
+
+def to_collapsed(capture: "Counter[str]") -> str:
+    """Render in Brendan Gregg's collapsed-stack format"""
+    return "".join(f"{stack} {count}\n" for stack, count in capture.most_common())
+
+
+def to_speedscope(capture: "Counter[str]", name: str = "profile") -> Dict[str, Any]:
+    """Render as a speedscope 'sampled' profile"""
+    frames, frame_index, samples, weights = [], {}, [], []
+    for stack, count in capture.items():
+        indices = []
+        for part in stack.split(";"):
+            if part not in frame_index:
+                frame_index[part] = len(frames)
+                frames.append({"name": part})
+            indices.append(frame_index[part])
+        samples.append(indices)
+        weights.append(count * SAMPLE_INTERVAL)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": name,
+        "exporter": "surprisesoul-profiler",
+    }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling sampled or header-triggered HTTP requests
+
+    Profiled responses carry an X-Profile-Id header; the stacks are kept in
+    memory and can be fetched with get_profile(). The capture spans the whole
+    response, including streamed bodies.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not should_profile(scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode("ascii"))
+                ]
+            await send(message)
+
+        capture = start_capture()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            stop_capture(capture, profile_id)
@@ -33,7 +33,7 @@ def create_user(name: str, email: str, password_hash: str):
 
 def get_user_by_email(email: str):
     """Get user by email"""
-    users = get_documents("users", {"email": email})
+    users = get_documents("users", {"email": email}, limit=1)
     return users[0] if users else None
 
 # =============================================================================
@@ -291,17 +291,9 @@ def track_page_view(page_path: str, user_id: str = None, session_id: str = None)
 # =============================================================================
 
 def create_notification(user_id: str, title: str, message: str, type: str = "info"):
-    """Create a notification"""
-    notification_data = {
-        "user_id": user_id,
-        "title": title,
-        "message": message,
-        "type": type,  # info, success, warning, error
-        "is_read": False,
-        "action_url": None,
-        "metadata": {}
-    }
-    return create_document("notifications", notification_data)
+    """Create a notification (also maintains the user's unread counter, see notifications.py)"""
+    from notifications import create_notification as create_counted_notification
+    return create_counted_notification(user_id, title, message, type)
 
 # =============================================================================
 # USAGE EXAMPLES
@@ -0,0 +1,148 @@
+"""
+Pincode Serviceability
+
+In-memory index answering COD eligibility, shipping charge and delivery ETA
+for a pincode without touching the database.
+
+The index is loaded from the CSV file named by PINCODE_FILE with the header:
+    pincode,cod,shipping_charge,eta_days
+(see tests/fixtures/pincodes.csv for an example). When PINCODE_FILE is
+unset no data is loaded and order validation is skipped.
+
+Pincodes are kept in a sorted array with parallel arrays for the other
+columns, so ~20k rows take well under a megabyte and a lookup is a single
+bisect. The file's mtime is checked at most every RELOAD_CHECK_SECONDS and
+the index is rebuilt and swapped in atomically when it changes. A file
+that fails to parse is logged and ignored until it changes again; the last
+good index keeps serving.
+"""
+
+import csv
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Optional
+
+PINCODE_FILE = os.getenv("PINCODE_FILE")
+RELOAD_CHECK_SECONDS = float(os.getenv("PINCODE_RELOAD_CHECK_SECONDS", 5))
+
+COLUMNS = ("pincode", "cod", "shipping_charge", "eta_days")
+MAX_SHIPPING_CHARGE = 0xFFFF  # array("H")
+MAX_ETA_DAYS = 0xFF  # array("B")
+
+logger = logging.getLogger(__name__)
+
+
+class PincodeIndex:
+    """Immutable sorted-array index built from the pincode file"""
+
+    def __init__(self, rows: Dict[int, tuple]):
+        codes = sorted(rows)
+        self.pincodes = array("I", codes)
+        self.cod = array("B", (rows[c][0] for c in codes))
+        self.shipping = array("H", (rows[c][1] for c in codes))
+        self.eta_days = array("B", (rows[c][2] for c in codes))
+
+    def __len__(self):
+        return len(self.pincodes)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "PincodeIndex":
+        """Build an index from a CSV file; raises ValueError on any malformed row"""
+        rows = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = [h.strip() for h in next(reader, [])]
+            if tuple(header) != COLUMNS:
+                raise ValueError(f"{path}: expected header {','.join(COLUMNS)}")
+            for row in reader:
+                if not row:
+                    continue
+                pincode, entry = _parse_row(row, reader.line_num)
+                rows[pincode] = entry
+        return cls(rows)
+
+    def lookup(self, pincode: int) -> Optional[Dict[str, Any]]:
+        i = bisect_left(self.pincodes, pincode)
+        if i == len(self.pincodes) or self.pincodes[i] != pincode:
+            return None
+        return {
+            "cod_available": bool(self.cod[i]),
+            "shipping_charge": self.shipping[i],
+            "eta_days": self.eta_days[i],
+        }
+
+
+def _parse_row(row: list, line_num: int) -> tuple:
+    if len(row) != len(COLUMNS) or any(not cell.strip() for cell in row):
+        raise ValueError(f"line {line_num}: expected {len(COLUMNS)} non-empty fields")
+    code, cod, shipping, eta = (cell.strip() for cell in row)
+    pincode = normalize_pincode(code)
+    if pincode is None:
+        raise ValueError(f"line {line_num}: invalid pincode {code!r}")
+    cod = cod.lower()
+    if cod not in ("1", "0", "true", "false", "yes", "no", "y", "n"):
+        raise ValueError(f"line {line_num}: invalid cod flag {cod!r}")
+    shipping, eta = int(shipping), int(eta)
+    if not 0 <= shipping <= MAX_SHIPPING_CHARGE:
+        raise ValueError(f"line {line_num}: shipping_charge out of range")
+    if not 0 < eta <= MAX_ETA_DAYS:
+        raise ValueError(f"line {line_num}: eta_days out of range")
+    return pincode, (cod in ("1", "true", "yes", "y"), shipping, eta)
+
+
+_index: Optional[PincodeIndex] = None
+_loaded_mtime = None
+_next_check = 0.0
+_reload_lock = threading.Lock()
+
+
+def _maybe_reload():
+    """Reload the index if the file changed; cheap when called on every lookup"""
+    global _index, _loaded_mtime, _next_check
+    now = time.monotonic()
+    if now < _next_check:
+        return
+    with _reload_lock:
+        if now < _next_check:
+            return
+        _next_check = now + RELOAD_CHECK_SECONDS
+        if not PINCODE_FILE:
+            return
+        try:
+            mtime = os.stat(PINCODE_FILE).st_mtime_ns
+        except OSError:
+            return  # keep serving the last good index
+        if mtime == _loaded_mtime:
+            return
+        # Record the attempt either way so a bad file isn't re-parsed every interval
+        _loaded_mtime = mtime
+        try:
+            _index = PincodeIndex.from_csv(PINCODE_FILE)
+        except (OSError, ValueError, csv.Error) as e:
+            logger.error("Ignoring pincode file %s, keeping the last good index: %s", PINCODE_FILE, e)
+
+
+def normalize_pincode(pincode: str) -> Optional[int]:
+    """Return the pincode as an int if it is a valid 6-digit Indian pincode"""
+    pincode = pincode.strip().replace(" ", "")
+    if len(pincode) != 6 or not pincode.isdigit() or pincode[0] == "0":
+        return None
+    return int(pincode)
+
+
+def check_pincode(pincode: str) -> Optional[Dict[str, Any]]:
+    """Serviceability details for a pincode, or None if no data is loaded"""
+    _maybe_reload()
+    index = _index
+    if index is None:
+        return None
+    code = normalize_pincode(pincode)
+    info = index.lookup(code) if code is not None else None
+    if info is None:
+        return {"pincode": pincode, "serviceable": False, "cod_available": False,
+                "shipping_charge": None, "eta_days": None}
+    return {"pincode": pincode, "serviceable": True, **info}
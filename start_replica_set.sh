@@ -0,0 +1,27 @@
+#!/bin/bash
+# Start a local 3-member MongoDB replica set (rs0) for testing read routing.
+# Catalog reads (secondaryPreferred) land on 27018/27019, orders on 27017.
+echo "Starting local MongoDB replica set rs0..."
+
+BASE_DIR=${RS_DATA_DIR:-/tmp/mongo-rs0}
+PORTS="27017 27018 27019"
+
+mkdir -p logs
+for port in $PORTS; do
+  mkdir -p "$BASE_DIR/$port"
+  mongod --replSet rs0 --port $port --bind_ip localhost \
+    --dbpath "$BASE_DIR/$port" --fork --logpath "logs/mongod-$port.log"
+done
+
+sleep 2
+mongosh --quiet --port 27017 --eval '
+try { rs.status() } catch (e) {
+  rs.initiate({_id: "rs0", members: [
+    {_id: 0, host: "localhost:27017", priority: 2},
+    {_id: 1, host: "localhost:27018"},
+    {_id: 2, host: "localhost:27019"}
+  ]})
+}'
+
+echo "Replica set started. Use:"
+echo "  DATABASE_URL=mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
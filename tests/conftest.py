@@ -0,0 +1,23 @@
+import os
+import sys
+
+import mongomock
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import catalog_io  # noqa: E402
+import database  # noqa: E402
+import main  # noqa: E402
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """In-memory database wired into every module that holds a db handle"""
+    mock_db = mongomock.MongoClient()["test"]
+    monkeypatch.setattr(database, "db", mock_db)
+    monkeypatch.setattr(database, "catalog_db", mock_db)
+    monkeypatch.setattr(database, "primary_db", mock_db)
+    monkeypatch.setattr(catalog_io, "_indexes_ready", False)
+    monkeypatch.setattr(main, "db", mock_db)
+    return mock_db
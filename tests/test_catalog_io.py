@@ -0,0 +1,81 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import catalog_io
+import main
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def client(mongo, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    return TestClient(main.app)
+
+
+def test_import_updates_only_given_fields(mongo):
+    full = {"title": "Lamp", "slug": "lamp", "price": 999, "description": "Etched acrylic",
+            "rating": 4.2, "images": ["a.jpg"], "featured": True}
+    catalog_io.import_catalog([json.dumps(full)], workers=1)
+    summary = catalog_io.import_catalog([json.dumps({"title": "Lamp v2", "slug": "lamp", "price": 899})], workers=1)
+
+    assert summary["updated"] == 1
+    doc = mongo["product"].find_one({"slug": "lamp"})
+    assert doc["title"] == "Lamp v2"
+    assert doc["price"] == 899
+    assert doc["description"] == "Etched acrylic"
+    assert doc["rating"] == 4.2
+    assert doc["images"] == ["a.jpg"]
+    assert doc["featured"] is True
+
+
+def test_import_applies_defaults_on_insert(mongo):
+    catalog_io.import_catalog([json.dumps({"title": "Frame", "slug": "frame", "price": 10})], workers=1)
+    doc = mongo["product"].find_one({"slug": "frame"})
+    assert doc["rating"] == 4.8
+    assert doc["category"] == "frames"
+    assert doc["images"] == []
+
+
+def test_import_reports_invalid_lines(mongo):
+    summary = catalog_io.import_catalog(["{bad", json.dumps({"title": "x", "slug": "x", "price": -1})], workers=1)
+    assert summary["rejected"] == 2
+    assert [e["line"] for e in summary["errors"]] == [1, 2]
+    assert summary["errors"][1]["error"].startswith("price: ")
+
+
+def test_http_import_names_missing_fields_and_does_not_fork(client, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("HTTP imports must not create a process pool")
+
+    monkeypatch.setattr(catalog_io, "ProcessPoolExecutor", no_pool)
+    body = json.dumps({"slug": "x", "price": 1}) + "\n" + json.dumps({"title": "ok", "slug": "ok", "price": 1})
+    r = client.post("/catalog/import", files={"file": ("c.ndjson", body.encode())}, headers=ADMIN)
+    assert r.status_code == 200
+    assert r.json()["inserted"] == 1
+    assert r.json()["errors"] == [{"line": 1, "error": "title: Field required"}]
+
+
+def test_seed_only_populates_an_empty_catalog(client, mongo):
+    assert client.post("/seed").json() == {"seeded": True, "count": 3}
+    assert client.post("/seed").json()["seeded"] is False
+    assert mongo["product"].count_documents({}) == 3
+
+
+def test_seed_skips_catalog_with_real_products(client, mongo):
+    mongo["product"].insert_one({"slug": "real-product", "title": "Real", "price": 1})
+    assert client.post("/seed").json() == {"seeded": False, "message": "Products already exist"}
+    assert mongo["product"].count_documents({}) == 1
+
+
+def test_duplicate_slugs_raise_clear_error_until_deduped(mongo):
+    mongo["product"].insert_many([{"slug": "a", "title": "first"}, {"slug": "a", "title": "second"}, {"slug": "b"}])
+
+    with pytest.raises(catalog_io.CatalogIndexError, match="dedupe"):
+        catalog_io.ensure_catalog_indexes()
+
+    assert catalog_io.dedupe_products() == 1
+    assert mongo["product"].find_one({"slug": "a"})["title"] == "first"
+    catalog_io.ensure_catalog_indexes()
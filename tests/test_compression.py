@@ -0,0 +1,96 @@
+import gzip
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import compression
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, "identity"),
+    ("", "identity"),
+    ("identity", "identity"),
+    ("gzip", "gzip"),
+    ("gzip;q=0", "identity"),
+    ("deflate, gzip;q=0.5", "gzip"),
+    ("*", "br"),
+    ("gzip;q=bogus", "identity"),
+])
+def test_negotiate_encoding(header, expected):
+    assert compression.negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_prefers_higher_q():
+    assert compression.negotiate_encoding("gzip, br") == "br"
+    assert compression.negotiate_encoding("gzip;q=1, br;q=0.5") == "gzip"
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ('W/"abc"', True),
+    ('"abc"', True),
+    ('"ab"', False),
+    ('"x", W/"abc" ', True),
+    ('"abcd"', False),
+    ('W/"abc-extra"', False),
+    ("*", True),
+])
+def test_etag_matches(header, expected):
+    assert compression.etag_matches(header, 'W/"abc"') is expected
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(compression, "_cache", compression.OrderedDict())
+    app = FastAPI()
+    payload = {
+        "text": "x" * (compression.MIN_SIZE * 2),
+        "created_at": datetime(2026, 10, 18, 22, 55, 43, 123000, tzinfo=timezone.utc),
+    }
+
+    @app.get("/big")
+    def big(request: Request):
+        return compression.cached_json_response(request, payload)
+
+    @app.get("/small")
+    def small(request: Request):
+        return compression.cached_json_response(request, {"ok": True})
+
+    return TestClient(app)
+
+
+def test_large_body_is_compressed_once_and_cached(client):
+    r = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert r.json()["created_at"] == "2026-10-18T22:55:43.123000+00:00"
+
+    etag = r.headers["etag"]
+    assert list(compression._cache[etag]) == ["gzip"]
+    cached = compression._cache[etag]["gzip"]
+    client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert compression._cache[etag]["gzip"] is cached
+    assert gzip.decompress(cached) == r.content
+
+
+def test_small_body_is_not_compressed(client):
+    r = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert r.json() == {"ok": True}
+
+
+def test_if_none_match_returns_304(client):
+    etag = client.get("/big").headers["etag"]
+    r = client.get("/big", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+    assert r.content == b""
+
+
+def test_if_none_match_list_and_wildcard(client):
+    etag = client.get("/big").headers["etag"]
+    assert client.get("/big", headers={"If-None-Match": f'"stale", {etag}'}).status_code == 304
+    assert client.get("/big", headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get("/big", headers={"If-None-Match": etag[:-3] + '"'}).status_code == 200
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+import database
+import main
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    """Route through real pymongo handles without connecting to a server"""
+    db = MongoClient("mongodb://localhost:27017/?replicaSet=rs0", connect=False)["test"]
+    catalog_db, primary_db = database.routed_handles(db)
+    monkeypatch.setattr(database, "db", db)
+    monkeypatch.setattr(database, "catalog_db", catalog_db)
+    monkeypatch.setattr(database, "primary_db", primary_db)
+    yield
+    db.client.close()
+
+
+def test_catalog_reads_prefer_secondaries_with_bounded_staleness(routed):
+    read_pref = database.catalog_collection("product").read_preference
+    assert read_pref == SecondaryPreferred(max_staleness=database.CATALOG_MAX_STALENESS)
+    assert database.CATALOG_MAX_STALENESS >= 90
+
+
+def test_fresh_catalog_reads_use_primary(routed):
+    assert database.catalog_collection("product", fresh=True).read_preference == Primary()
+
+
+def test_order_paths_use_primary_with_majority_writes(routed):
+    collection = database.primary_collection("order")
+    assert collection.read_preference == Primary()
+    assert collection.write_concern.document == {"w": "majority"}
+
+
+def test_get_documents_is_capped(mongo, monkeypatch):
+    mongo["order"].insert_many([{"n": i} for i in range(10)])
+    monkeypatch.setattr(database, "MAX_DOCUMENTS", 3)
+    assert len(database.get_documents("order")) == 3
+    assert len(database.get_documents("order", limit=50)) == 3
+    assert len(list(database.stream_documents("order", batch_size=4))) == 10
+
+
+def test_fresh_reads_require_admin(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    client = TestClient(main.app)
+    assert client.get("/products?fresh=true").status_code == 401
+    assert client.get("/products?fresh=true", headers={"X-Admin-Token": "secret"}).status_code == 200
+    assert client.get("/products").status_code == 200
+
+
+@pytest.mark.skipif(not os.getenv("MONGO_RS_URL"), reason="set MONGO_RS_URL to a replica set (see start_replica_set.sh)")
+def test_routing_against_replica_set():
+    client = MongoClient(os.environ["MONGO_RS_URL"])
+    try:
+        catalog_db, primary_db = database.routed_handles(client["routing_test"])
+        primary_db["product"].insert_one({"slug": "routing-check"})
+
+        cursor = catalog_db["product"].find({"slug": "routing-check"})
+        list(cursor)
+        assert cursor.address in client.secondaries
+
+        cursor = primary_db["product"].find({"slug": "routing-check"})
+        assert list(cursor)
+        assert cursor.address == client.primary
+    finally:
+        client.drop_database("routing_test")
+        client.close()
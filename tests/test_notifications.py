@@ -0,0 +1,132 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+import main
+import notifications
+
+
+@pytest.fixture
+def inbox(mongo, monkeypatch):
+    monkeypatch.setattr(notifications, "_count_cache", {})
+    monkeypatch.setattr(notifications, "_indexes_ready", False)
+    return mongo
+
+
+def legacy(mongo, user_id, n, is_read=False):
+    """Notifications written before counters existed"""
+    ids = mongo["notifications"].insert_many([
+        {"user_id": user_id, "is_read": is_read, "created_at": datetime(2026, 1, 1, 0, 0, i)} for i in range(n)
+    ]).inserted_ids
+    return [str(i) for i in ids]
+
+
+def test_counter_tracks_create_and_mark_read(inbox):
+    ids = [notifications.create_notification("u1", f"t{i}", "m") for i in range(3)]
+    notifications.create_notification("u2", "other", "m")
+    assert notifications.get_unread_count("u1") == 3
+
+    assert notifications.mark_read("u1", ids[0]) is True
+    assert notifications.mark_read("u1", ids[0]) is False
+    assert notifications.mark_read("u2", ids[1]) is False
+    assert notifications.mark_read("u1", "not-an-id") is False
+    assert notifications.get_unread_count("u1") == 2
+
+    assert notifications.mark_all_read("u1") == 2
+    assert notifications.get_unread_count("u1") == 0
+    assert notifications.get_unread_count("u2") == 1
+
+
+def test_backfill_counts_legacy_notifications(inbox):
+    legacy(inbox, "u1", 3)
+    legacy(inbox, "u2", 2, is_read=True)
+    assert notifications.backfill_unread_counters() == 2
+    assert notifications.get_unread_count("u1") == 3
+    assert notifications.get_unread_count("u2") == 0
+
+
+def test_counters_stay_consistent_after_backfill(inbox):
+    ids = legacy(inbox, "u1", 3)
+    notifications.backfill_unread_counters()
+    assert notifications.mark_read("u1", ids[0]) is True
+    notifications.create_notification("u1", "new", "m")
+    assert notifications.get_unread_count("u1") == 3
+    assert notifications.mark_all_read("u1") == 3
+    assert notifications.get_unread_count("u1") == 0
+
+
+def test_first_notification_creates_counter(inbox):
+    notifications.create_notification("new-user", "hello", "m")
+    assert inbox["notification_counters"].find_one({"_id": "new-user"})["unread"] == 1
+    assert notifications.get_unread_count("new-user") == 1
+
+
+def test_failed_insert_rolls_back_counter(inbox, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(notifications, "create_document", fail)
+    with pytest.raises(RuntimeError):
+        notifications.create_notification("u1", "t", "m")
+    assert notifications.get_unread_count("u1") == 0
+
+
+def test_negative_counter_is_rebuilt(inbox):
+    legacy(inbox, "u1", 2)
+    inbox["notification_counters"].insert_one({"_id": "u1", "unread": -4})
+    assert notifications.get_unread_count("u1") == 2
+
+
+def test_count_is_cached_until_a_write(inbox):
+    notifications.create_notification("u1", "t", "m")
+    assert notifications.get_unread_count("u1") == 1
+    inbox["notification_counters"].update_one({"_id": "u1"}, {"$set": {"unread": 7}})
+    assert notifications.get_unread_count("u1") == 1
+    notifications.create_notification("u1", "t", "m")
+    assert notifications.get_unread_count("u1") == 8
+
+
+def test_inbox_pages_through_same_millisecond_notifications(inbox):
+    same_ms = datetime(2026, 10, 18, 12, 0, 0, 123000)
+    inbox["notifications"].insert_many(
+        [{"user_id": "u1", "is_read": i % 2 == 0, "created_at": same_ms, "n": i} for i in range(7)]
+    )
+    seen, cursor = [], None
+    while True:
+        page = notifications.get_inbox("u1", cursor=cursor, limit=3)
+        seen.extend(n["n"] for n in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(seen) == list(range(7))
+    assert len(seen) == 7
+
+    unread = notifications.get_inbox("u1", unread_only=True, limit=10)["items"]
+    assert sorted(n["n"] for n in unread) == [1, 3, 5]
+
+
+def test_cursor_round_trip():
+    oid = ObjectId()
+    created_at = datetime(2026, 10, 18, 12, 0, 0, 123000)
+    decoded_at, decoded_id = notifications.decode_cursor(notifications.encode_cursor(created_at, oid))
+    assert decoded_id == oid
+    assert decoded_at.replace(tzinfo=None) == created_at
+    for bad in ("", "abc", "123-nope", "123"):
+        with pytest.raises(ValueError):
+            notifications.decode_cursor(bad)
+
+
+def test_endpoints_require_admin(inbox, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    client = TestClient(main.app)
+    assert client.get("/users/u1/notifications/unread-count").status_code == 401
+    assert client.get("/users/u1/notifications").status_code == 401
+    assert client.post("/users/u1/notifications/read-all").status_code == 401
+
+    admin = {"X-Admin-Token": "secret"}
+    notifications.create_notification("u1", "t", "m")
+    assert client.get("/users/u1/notifications/unread-count", headers=admin).json() == {"unread": 1}
+    assert client.get("/users/u1/notifications?cursor=bogus", headers=admin).status_code == 400
+    assert client.post("/users/u1/notifications/read-all", headers=admin).json() == {"marked": 1}
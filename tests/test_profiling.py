@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import profiling
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("seconds", ["-1", "0", str(profiling.MAX_CAPTURE_SECONDS + 1)])
+def test_capture_rejects_out_of_range_seconds(client, seconds):
+    r = client.get("/admin/profile", params={"seconds": seconds}, headers=ADMIN)
+    assert r.status_code == 422
+
+
+def busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_capture_returns_collapsed_stacks(client):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_worker, args=(stop,))
+    worker.start()
+    try:
+        r = client.get("/admin/profile", params={"seconds": 0.1}, headers=ADMIN)
+    finally:
+        stop.set()
+        worker.join()
+    assert r.status_code == 200
+    assert "test_profiling:busy_worker" in r.text
+    assert r.headers["content-type"].startswith("text/plain")
+    for line in r.text.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert ";" in stack or ":" in stack
+        assert int(count) > 0
+
+
+def test_capture_for_validates_range():
+    with pytest.raises(ValueError):
+        profiling.capture_for(-1)
+
+
+def test_speedscope_export_shares_frames():
+    capture = profiling.Counter({"a:main;b:work": 3, "a:main;c:idle": 1})
+    out = profiling.to_speedscope(capture)
+    assert [f["name"] for f in out["shared"]["frames"]] == ["a:main", "b:work", "c:idle"]
+    assert out["profiles"][0]["samples"] == [[0, 1], [0, 2]]
+    assert profiling.to_collapsed(capture) == "a:main;b:work 3\na:main;c:idle 1\n"
+
+
+@pytest.fixture
+def slow_catalog(monkeypatch):
+    """Make /products busy long enough to collect samples"""
+    def busy_catalog():
+        deadline = time.monotonic() + 0.1
+        while time.monotonic() < deadline:
+            sum(range(1000))
+        return []
+
+    monkeypatch.setattr(main, "demo_catalog", busy_catalog)
+    monkeypatch.setattr(profiling, "TRIGGER_TOKEN", "secret")
+
+
+def test_unprofiled_request_has_no_profile_id(client, slow_catalog):
+    assert "x-profile-id" not in client.get("/products").headers
+    assert "x-profile-id" not in client.get("/products", headers={"X-Profile": "wrong"}).headers
+
+
+def test_trigger_header_profiles_request(client, slow_catalog):
+    r = client.get("/products", headers={"X-Profile": "secret"})
+    assert r.status_code == 200
+    profile_id = r.headers["x-profile-id"]
+
+    collapsed = client.get(f"/admin/profiles/{profile_id}", headers=ADMIN)
+    assert collapsed.status_code == 200
+    assert "main:list_products" in collapsed.text
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.text.splitlines())
+
+    speedscope = client.get(f"/admin/profiles/{profile_id}", params={"format": "speedscope"}, headers=ADMIN).json()
+    assert speedscope["profiles"][0]["type"] == "sampled"
+    assert "main:list_products" in [f["name"] for f in speedscope["shared"]["frames"]]
+
+
+def test_unknown_profile_and_format(client):
+    assert client.get("/admin/profiles/nope", headers=ADMIN).status_code == 404
+    assert client.get("/admin/profiles/nope", params={"format": "svg"}, headers=ADMIN).status_code == 400
+    assert client.get("/admin/profiles/nope").status_code == 401
+
+
+def test_sample_rate_profiles_without_header(client, slow_catalog, monkeypatch):
+    monkeypatch.setattr(profiling, "SAMPLE_RATE", 1.0)
+    assert "x-profile-id" in client.get("/products").headers
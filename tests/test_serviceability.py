@@ -0,0 +1,138 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+import serviceability
+from schemas import Order
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "pincodes.csv")
+HEADER = "pincode,cod,shipping_charge,eta_days\n"
+
+
+@pytest.fixture
+def use_file(monkeypatch):
+    """Point the module at a pincode file and force a reload on every lookup"""
+    def use(path):
+        monkeypatch.setattr(serviceability, "PINCODE_FILE", path)
+        monkeypatch.setattr(serviceability, "RELOAD_CHECK_SECONDS", 0)
+        monkeypatch.setattr(serviceability, "_next_check", 0.0)
+        monkeypatch.setattr(serviceability, "_loaded_mtime", None)
+        monkeypatch.setattr(serviceability, "_index", None)
+    return use
+
+
+def write(path, body, mtime):
+    path.write_text(HEADER + body)
+    os.utime(path, ns=(mtime, mtime))
+    return str(path)
+
+
+def order_to(pincode, payment_method="COD", shipping=0):
+    return Order(
+        items=[{"product_slug": "lamp", "unit_price": 1}], subtotal=1, shipping=shipping, total=1 + shipping,
+        payment_method=payment_method, customer={"name": "A", "pincode": pincode},
+    )
+
+
+def test_index_lookup():
+    index = serviceability.PincodeIndex.from_csv(FIXTURE)
+    assert len(index) == 15
+    assert index.lookup(110001) == {"cod_available": True, "shipping_charge": 0, "eta_days": 3}
+    assert index.lookup(744101) == {"cod_available": False, "shipping_charge": 149, "eta_days": 9}
+    assert index.lookup(110002) is None
+    assert index.lookup(100000) is None
+    assert index.lookup(999999) is None
+
+
+@pytest.mark.parametrize("pincode, expected", [
+    ("560001", 560001), (" 560 001 ", 560001), ("056001", None), ("56001", None), ("abcdef", None),
+])
+def test_normalize_pincode(pincode, expected):
+    assert serviceability.normalize_pincode(pincode) == expected
+
+
+def test_unconfigured_skips_order_validation(use_file):
+    use_file(None)
+    assert serviceability.check_pincode("110002") is None
+    main.validate_serviceability(order_to("110002"))
+
+
+def test_order_validation(use_file):
+    use_file(FIXTURE)
+    main.validate_serviceability(order_to("110001"))
+    main.validate_serviceability(order_to("744101", payment_method="Prepaid", shipping=149))
+    with pytest.raises(HTTPException) as exc:
+        main.validate_serviceability(order_to("744101", shipping=149))
+    assert exc.value.status_code == 422
+    assert "Cash on Delivery" in exc.value.detail
+    with pytest.raises(HTTPException) as exc:
+        main.validate_serviceability(order_to("110002"))
+    assert "Delivery not available" in exc.value.detail
+
+
+@pytest.mark.parametrize("row", [
+    "110001,1,-5,3",
+    "110001,1,0,300",
+    "110001,1,0",
+    "110001,1,0,3,extra",
+    "110001,1,,3",
+    "110001,maybe,0,3",
+    "11000,1,0,3",
+    "110001,1,free,3",
+])
+def test_from_csv_rejects_malformed_rows(tmp_path, row):
+    path = write(tmp_path / "p.csv", row + "\n", 1)
+    with pytest.raises(ValueError):
+        serviceability.PincodeIndex.from_csv(path)
+
+
+def test_bad_reload_keeps_last_good_index(tmp_path, use_file):
+    path = tmp_path / "p.csv"
+    use_file(write(path, "110001,1,0,3\n", 1_000_000_000))
+    assert serviceability.check_pincode("110001")["serviceable"] is True
+
+    write(path, "110001,1,-5,3\n400001,1,0,300\n", 2_000_000_000)
+    assert serviceability.check_pincode("110001")["serviceable"] is True
+
+    write(path, "110001,1,0,3\n400001,0,10,2\n", 3_000_000_000)
+    assert serviceability.check_pincode("400001") == {
+        "pincode": "400001", "serviceable": True, "cod_available": False, "shipping_charge": 10, "eta_days": 2,
+    }
+
+
+def test_order_validation_checks_shipping_charge(use_file):
+    use_file(FIXTURE)
+    main.validate_serviceability(order_to("682001", shipping=49))
+    for wrong in (0, 99):
+        with pytest.raises(HTTPException) as exc:
+            main.validate_serviceability(order_to("682001", shipping=wrong))
+        assert exc.value.detail == "Shipping charge for this pincode is 49"
+
+
+def test_serviceability_endpoint(use_file):
+    client = TestClient(main.app)
+    use_file(None)
+    assert client.get("/serviceability/110001").status_code == 503
+
+    use_file(FIXTURE)
+    assert client.get("/serviceability/1100").status_code == 400
+    assert client.get("/serviceability/abcdef").status_code == 400
+    assert client.get("/serviceability/110001").json() == {
+        "pincode": "110001", "serviceable": True, "cod_available": True, "shipping_charge": 0, "eta_days": 3,
+    }
+    assert client.get("/serviceability/110002").json() == {
+        "pincode": "110002", "serviceable": False, "cod_available": False, "shipping_charge": None, "eta_days": None,
+    }
+
+
+def test_order_endpoint_rejects_unserviceable_pincode(use_file):
+    use_file(FIXTURE)
+    client = TestClient(main.app)
+    payload = order_to("110002").model_dump()
+    r = client.post("/orders", json=payload)
+    assert r.status_code == 422
+    payload["customer"]["pincode"] = "110001"
+    assert client.post("/orders", json=payload).json() == {"order_id": "demo-order"}
@@ -0,0 +1,104 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+import main
+
+
+class SpyCursor:
+    """Cursor stand-in that records how far it was read and whether it was closed"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.position = 0
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.position >= len(self.docs):
+            raise StopIteration
+        self.position += 1
+        return self.docs[self.position - 1]
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def spy(monkeypatch):
+    cursor = SpyCursor([{"n": i} for i in range(10)])
+    monkeypatch.setattr(database, "_find", lambda *args, **kwargs: cursor)
+    return cursor
+
+
+def collect(agen, stop_after=None):
+    async def run():
+        out = []
+        async for doc in agen:
+            out.append(doc)
+            if stop_after is not None and len(out) == stop_after:
+                break
+        await agen.aclose()
+        return out
+    return asyncio.run(run())
+
+
+def test_astream_reads_in_batches(spy):
+    async def first_doc():
+        agen = database.astream_documents("order", batch_size=3)
+        doc = await agen.__anext__()
+        position = spy.position
+        await agen.aclose()
+        return doc, position
+
+    doc, position = asyncio.run(first_doc())
+    assert doc == {"n": 0}
+    assert position == 3
+
+
+def test_astream_yields_everything_and_closes(spy):
+    assert [d["n"] for d in collect(database.astream_documents("order", batch_size=4))] == list(range(10))
+    assert spy.closed
+
+
+def test_astream_closes_cursor_on_early_exit(spy):
+    assert len(collect(database.astream_documents("order", batch_size=4), stop_after=2)) == 2
+    assert spy.closed
+    assert spy.position == 4
+
+
+def test_batch_size_none_falls_back_to_default(spy, monkeypatch):
+    monkeypatch.setattr(database, "STREAM_BATCH_SIZE", 5)
+    assert len(collect(database.astream_documents("order", batch_size=None))) == 10
+    spy.position = 0
+    assert len(list(database.stream_documents("order", batch_size=None))) == 10
+
+
+@pytest.mark.parametrize("batch_size", [0, -1])
+def test_non_positive_batch_size_is_rejected(spy, batch_size):
+    with pytest.raises(ValueError):
+        list(database.stream_documents("order", batch_size=batch_size))
+
+
+def test_orders_export_streams_iso_ndjson(mongo, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    created = datetime(2026, 10, 18, 23, 8, 16, 610000, tzinfo=timezone.utc)
+    mongo["order"].insert_many(
+        [{"status": "pending" if i % 2 else "confirmed", "total": i, "created_at": created} for i in range(5)]
+    )
+    client = TestClient(main.app)
+    assert client.get("/orders/export").status_code == 401
+
+    r = client.get("/orders/export?status=pending", headers={"X-Admin-Token": "secret"})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [o["total"] for o in lines] == [1, 3]
+    assert all(isinstance(o["_id"], str) for o in lines)
+    assert lines[0]["created_at"].startswith("2026-10-18T23:08:16.610")